@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import asyncio
+import fnmatch
 import json
 import os
+import re
 import shutil
 import socket
 import subprocess
@@ -11,7 +13,7 @@ import tempfile
 import time
 import uuid
 import zipfile
-from fnmatch import fnmatch
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Union
 
@@ -27,11 +29,16 @@ ZPath = Union[Path, zipfile.Path]
 TEMP_FOLDER = Path(__file__).parent.parent / "temp"
 COMFY_PACK_DIR = Path(__file__).parent.parent / "src" / "comfy_pack"
 EXCLUDE_PACKAGES = ["bentoml", "onnxruntime", "conda", "nvidia-*"]
+_EXCLUDE_RE = re.compile(
+    "|".join(f"(?:{fnmatch.translate(pat)})" for pat in EXCLUDE_PACKAGES)
+)
+COPY_BUFSIZE = 4 * 1024 * 1024
+MAX_STORE_WORKERS = 4
+# bounds requests to CivitAI / HuggingFace / search engines, which rate limit
+MAX_SOURCE_LOOKUPS = 4
 
 
 def normalize_name(name: str) -> str:
-    import re
-
     return re.sub(r"[-_.]+", "-", name).lower()
 
 
@@ -69,12 +76,11 @@ async def _save_snapshot() -> dict[str, Any]:
 
 async def _write_snapshot(path: ZPath, data: dict, models: list) -> None:
     snapshot = await _save_snapshot()
-    for package in list(snapshot["pips"]):
-        if any(
-            fnmatch(normalize_name(package.split("==")[0]), pat)
-            for pat in EXCLUDE_PACKAGES
-        ):
-            del snapshot["pips"][package]
+    snapshot["pips"] = {
+        package: value
+        for package, value in snapshot["pips"].items()
+        if not _EXCLUDE_RE.match(normalize_name(package.split("==")[0]))
+    }
     with path.joinpath("snapshot.json").open("w") as f:
         snapshot.update(
             {
@@ -82,7 +88,7 @@ async def _write_snapshot(path: ZPath, data: dict, models: list) -> None:
                 "models": models,
             }
         )
-        f.write(json.dumps(snapshot, indent=2))
+        json.dump(snapshot, f)
 
 
 def _is_port_in_use(port: int | str, host="localhost"):
@@ -98,20 +104,79 @@ def _is_port_in_use(port: int | str, host="localhost"):
             return True
 
 
-def _is_file_refered(file_path: Path, workflow_api: dict) -> bool:
-    """ """
-    used_inputs = set()
+_ANNOTATIONS = (" [input]", " [output]", " [temp]")
+
+
+def _get_referenced_inputs(workflow_api: dict) -> set[str]:
+    """Collect all string input values used in the workflow, both as is and
+    without the annotation folder_paths.get_annotated_filepath accepts
+    (e.g. ``clipspace/mask.png [input]`` from the mask editor)"""
+    referenced = set()
     for node in workflow_api.values():
-        for _, v in node["inputs"].items():
+        for v in node["inputs"].values():
             if isinstance(v, str):
-                used_inputs.add(v)
-    all_inputs = "\n".join(used_inputs)
-    file_path = file_path.absolute().relative_to(folder_paths.base_path)
-    if file_path.parts[0] == "input":
-        relpath = Path(*file_path.parts[1:])
+                referenced.add(v)
+                if v.endswith(_ANNOTATIONS):
+                    referenced.add(v[: v.rindex(" [")])
+    return referenced
+
+
+@lru_cache(maxsize=None)
+def _base_prefix() -> str:
+    """The absolute ComfyUI base path with a trailing separator"""
+    return os.path.join(os.path.abspath(folder_paths.base_path), "")
+
+
+def _relpath_to_base(filename: str) -> str:
+    base_prefix = _base_prefix()
+    if filename.startswith(base_prefix):
+        return filename[len(base_prefix) :]
+    return os.path.relpath(filename, base_prefix)
+
+
+def _is_file_refered(file_path: str, referenced: set[str]) -> bool:
+    """Check if the file is used by the workflow, relative paths are from base"""
+    if os.path.isabs(file_path):
+        file_path = _relpath_to_base(file_path)
+    parts = file_path.split(os.sep)
+    if parts[0] == "input":
+        relpath = os.sep.join(parts[1:])
     else:  # models
-        relpath = Path(*file_path.parts[2:])
-    return str(relpath) in all_inputs
+        relpath = os.sep.join(parts[2:])
+    return relpath in referenced
+
+
+def _walk_models(root: str):
+    """Yield absolute paths and stat results of all non-hidden files under root.
+
+    ComfyUI's tracked placeholders (``put_*_here``) and other empty files are
+    skipped, git ls-files --others never listed the former.
+    """
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    if entry.name.startswith("put_") and entry.name.endswith("_here"):
+                        continue
+                    stat = entry.stat()
+                    if stat.st_size == 0:
+                        continue
+                    yield os.path.abspath(entry.path), stat
+
+
+def _store_model(model_tag: str, filename: str, relpath: str) -> None:
+    import bentoml
+
+    try:
+        bentoml.models.get(model_tag)
+    except bentoml.exceptions.NotFound:
+        with bentoml.models.create(model_tag, labels={"filename": relpath}) as model:
+            shutil.copyfile(filename, model.path_of("model.bin"))
 
 
 async def _get_models(
@@ -121,21 +186,9 @@ async def _get_models(
     ensure_sha=True,
     ensure_source=True,
 ) -> list:
-    proc = await asyncio.subprocess.create_subprocess_exec(
-        "git",
-        "ls-files",
-        "--others",
-        folder_paths.models_dir,
-        stdout=subprocess.PIPE,
-    )
-    stdout, _ = await proc.communicate()
-
     models = []
-    model_filenames = [
-        os.path.abspath(line.strip().strip('"').replace('\\\\', '/'))
-        for line in stdout.decode().splitlines()
-        if not os.path.basename(line.strip().strip('"').replace('\\\\', '/')).startswith(".")
-    ]
+    stat_cache = dict(_walk_models(folder_paths.models_dir))
+    model_filenames = list(stat_cache)
 
     # Only compute hashes for referenced models
     to_include = []
@@ -150,30 +203,37 @@ async def _get_models(
     model_hashes = await async_batch_get_sha256(
         to_include,
         cache_only=not (ensure_sha or store_models),
+        stat_cache=stat_cache,
     )
 
+    # Look up the sources of all distinct hashes concurrently
+    model_shas = list(dict.fromkeys(model_hashes.get(f) for f in to_include))
+    lookup_semaphore = asyncio.Semaphore(MAX_SOURCE_LOOKUPS)
+
+    async def _lookup(sha: str) -> dict:
+        async with lookup_semaphore:
+            return await alookup_model_source(sha, cache_only=not ensure_source)
+
+    sources = await asyncio.gather(*(_lookup(sha) for sha in model_shas))
+    model_sources = dict(zip(model_shas, sources))
+
+    to_store: dict[str, tuple[str, str]] = {}
     for filename in to_include:
-        # Skip if file doesn't exist
-        if not os.path.exists(filename):
-            continue
-            
-        relpath = os.path.relpath(filename, folder_paths.base_path)
+        stat = stat_cache[filename]
+        relpath = _relpath_to_base(filename)
 
         model_data = {
             "filename": relpath,
-            "size": os.path.getsize(filename),
-            "atime": os.path.getatime(filename),
-            "ctime": os.path.getctime(filename),
+            "size": stat.st_size,
+            "atime": stat.st_atime,
+            "ctime": stat.st_ctime,
             "disabled": relpath not in model_filter
             if model_filter is not None
             else False,
             "sha256": model_hashes.get(filename),
         }
 
-        model_data["source"] = await alookup_model_source(
-            model_data["sha256"],
-            cache_only=not ensure_source,
-        )
+        model_data["source"] = model_sources[model_data["sha256"]]
         # should_store = store_models and (
         #     model_data["source"].get("source") != "huggingface"
         #     or model_data["source"].get("repo", "").startswith("datasets/")
@@ -181,34 +241,53 @@ async def _get_models(
         should_store = store_models
 
         if should_store:
-            import bentoml
-
             model_tag = f"cpack-model:{model_data['sha256'][:16]}"
-            try:
-                model = bentoml.models.get(model_tag)
-            except bentoml.exceptions.NotFound:
-                with bentoml.models.create(
-                    model_tag, labels={"filename": relpath}
-                ) as model:
-                    shutil.copy(filename, model.path_of("model.bin"))
+            to_store.setdefault(model_tag, (filename, relpath))
             model_data["model_tag"] = model_tag
         models.append(model_data)
+
+    # Copy models into the BentoML store concurrently, off the event loop
+    semaphore = asyncio.Semaphore(MAX_STORE_WORKERS)
+
+    async def _store(model_tag: str, filename: str, relpath: str) -> None:
+        async with semaphore:
+            await asyncio.to_thread(_store_model, model_tag, filename, relpath)
+
+    await asyncio.gather(*(_store(tag, *paths) for tag, paths in to_store.items()))
+
     if workflow_api:
+        referenced = _get_referenced_inputs(workflow_api)
         for model in models:
-            model["refered"] = _is_file_refered(Path(model["filename"]), workflow_api)
+            model["refered"] = _is_file_refered(model["filename"], referenced)
     return models
 
 
 async def _write_workflow(path: ZPath, data: dict) -> None:
     print("Package => Writing workflow")
     with path.joinpath("workflow_api.json").open("w") as f:
-        f.write(json.dumps(data["workflow_api"], indent=2))
+        json.dump(data["workflow_api"], f, indent=2)
     with path.joinpath("workflow.json").open("w") as f:
-        f.write(json.dumps(data["workflow"], indent=2))
-
-
-async def _write_inputs(path: ZPath, data: dict) -> None:
-    print("Package => Writing inputs")
+        json.dump(data["workflow"], f, indent=2)
+
+
+def _walk_inputs(root: str):
+    """Yield (relpath, is_dir) of all entries under root, parents before children"""
+    prefix = os.path.join(root, "")
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                rel = entry.path[len(prefix) :]
+                if entry.is_dir():
+                    yield rel, True
+                    # like glob("**"), do not descend into symlinked dirs
+                    if not entry.is_symlink():
+                        stack.append(entry.path)
+                elif entry.is_file():
+                    yield rel, False
+
+
+def _write_inputs_sync(path: ZPath, data: dict) -> None:
     if isinstance(path, Path):
         path.joinpath("input").mkdir(exist_ok=True)
 
@@ -219,23 +298,49 @@ async def _write_inputs(path: ZPath, data: dict) -> None:
     else:
         selected = None
 
-    src_root = Path(input_dir).absolute()
-    for src in src_root.glob("**/*"):
-        rel = src.relative_to(src_root)
-        if selected is not None and str(rel) not in selected:
+    src_root = os.path.abspath(input_dir)
+    for rel, is_dir in _walk_inputs(src_root):
+        if selected is not None and rel not in selected:
             continue
-        if src.is_dir():
+        if is_dir:
             if isinstance(path, Path):
                 path.joinpath("input").joinpath(rel).mkdir(parents=True, exist_ok=True)
-        if src.is_file():
-            with path.joinpath("input").joinpath(rel).open("wb") as f:
-                with open(src, "rb") as input_file:
-                    shutil.copyfileobj(input_file, f)
+            continue
+        src = os.path.join(src_root, rel)
+        target = path.joinpath("input").joinpath(rel)
+        if isinstance(target, Path):
+            # uses sendfile/copy_file_range where the platform supports it
+            shutil.copyfile(src, target)
+            continue
+        # stream straight into the archive, allowing members over 2 GiB
+        with target.root.open(target.at, "w", force_zip64=True) as f:
+            with open(src, "rb") as input_file:
+                shutil.copyfileobj(input_file, f, length=COPY_BUFSIZE)
+
+
+async def _write_inputs(path: ZPath, data: dict) -> None:
+    print("Package => Writing inputs")
+    await asyncio.to_thread(_write_inputs_sync, path, data)
 
 
 @PromptServer.instance.routes.post("/bentoml/pack")
 async def pack_workspace(request):
     data = await request.json()
+    # Stored by default, the inputs are mostly media that does not compress.
+    # 1-9 opt in to deflate, where 1 is much faster than zlib's default 6.
+    try:
+        compression_level = int(data.get("compression_level", 0))
+    except (TypeError, ValueError):
+        compression_level = -1
+    if not 0 <= compression_level <= 9:
+        return web.json_response(
+            {
+                "result": "error",
+                "error": "compression_level must be an integer from 0 to 9",
+            },
+            status=400,
+        )
+
     TEMP_FOLDER.mkdir(exist_ok=True)
     older_than_1h = time.time() - 60 * 60
     for file in TEMP_FOLDER.iterdir():
@@ -243,8 +348,17 @@ async def pack_workspace(request):
             file.unlink()
 
     zip_filename = f"{uuid.uuid4()}.zip"
-
-    with zipfile.ZipFile(TEMP_FOLDER / zip_filename, "w") as zf:
+    if compression_level > 0:
+        compression = zipfile.ZIP_DEFLATED
+    else:
+        compression, compression_level = zipfile.ZIP_STORED, None
+
+    with zipfile.ZipFile(
+        TEMP_FOLDER / zip_filename,
+        "w",
+        compression=compression,
+        compresslevel=compression_level,
+    ) as zf:
         path = zipfile.Path(zf)
         await _prepare_pack(path, data)
 
@@ -269,7 +383,7 @@ class DevServer:
         # prepare a temporary directory
         cls.run_dir = Path(tempfile.mkdtemp(suffix="-bento", prefix="comfy-pack-"))
         with cls.run_dir.joinpath("workflow_api.json").open("w") as f:
-            f.write(json.dumps(workflow_api, indent=2))
+            json.dump(workflow_api, f, indent=2)
         shutil.copy(
             Path(comfy_pack_file).with_name("service.py"),
             cls.run_dir / "service.py",
@@ -473,26 +587,31 @@ async def get_models(request):
     return web.json_response({"models": models})
 
 
-async def _get_inputs(workflow_api):
-    input_dir = folder_paths.get_input_directory()
+def _get_inputs_sync(workflow_api):
+    input_dir = os.path.abspath(folder_paths.get_input_directory())
     inputs = []
-    for src in Path(input_dir).rglob("*"):
-        if src.is_file():
-            rel = src.relative_to(input_dir)
-            badges = []
-            checked = False
-            if _is_file_refered(src, workflow_api):
-                badges.append({"text": "Referenced"})
-                checked = True
-            data = {
-                "path": str(rel),
-                "badges": badges,
-                "checked": checked,
-            }
-            inputs.append(data)
+    referenced = _get_referenced_inputs(workflow_api)
+    for rel, is_dir in _walk_inputs(input_dir):
+        if is_dir:
+            continue
+        badges = []
+        checked = False
+        if rel in referenced:
+            badges.append({"text": "Referenced"})
+            checked = True
+        data = {
+            "path": rel,
+            "badges": badges,
+            "checked": checked,
+        }
+        inputs.append(data)
     return inputs
 
 
+async def _get_inputs(workflow_api):
+    return await asyncio.to_thread(_get_inputs_sync, workflow_api)
+
+
 @PromptServer.instance.routes.post("/bentoml/file/query")
 async def get_inputs(request):
     data = await request.json()
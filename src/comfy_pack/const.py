@@ -20,3 +20,9 @@ COMFY_PACK_REPO = "https://github.com/bentoml/comfy-pack.git"
 COMFYUI_MANAGER_REPO = "https://github.com/ltdrdata/ComfyUI-Manager.git"
 
 STRICT_MODE = os.environ.get("CPACK_STRICT_MODE", "0") in ["1", "true", "True"]
+# Opt-in: a cold mirror is a full clone, slower than a one-off shallow clone
+GIT_CACHE_DIR = (
+    pathlib.Path.home() / ".cache" / "comfy-pack" / "git"
+    if os.environ.get("CPACK_GIT_CACHE", "0") in ["1", "true", "True"]
+    else None
+)
@@ -1,40 +1,122 @@
 import asyncio
+import contextlib
+import hashlib
 import json
+import logging
 import os
-import subprocess
-import sys
+import queue
+import threading
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from functools import partial
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from .const import SHA_CACHE_FILE
 
-CALC_CMD = """
-import hashlib
-import sys
+logger = logging.getLogger(__name__)
+
+# Files at least this large are hashed while the next chunks are read ahead
+READ_AHEAD_THRESHOLD = 256 * 1024 * 1024
+READ_AHEAD_DEPTH = 4
+
+
+def _check_openssl_backend() -> None:
+    """Warn once when hashlib's SHA-256 is not backed by OpenSSL, whose
+    implementation is hardware accelerated (SHA-NI)"""
+    if not hashlib.sha256.__name__.startswith("openssl_"):
+        logger.warning(
+            "hashlib is not backed by OpenSSL, SHA-256 of model files may be slow. "
+            "Consider using a Python build linked against OpenSSL."
+        )
+
+
+_check_openssl_backend()
+
 
-filepath = sys.argv[1]
-chunk_size = int(sys.argv[2])
+def _read_ahead(f, chunk_size: int, depth: int = READ_AHEAD_DEPTH):
+    """Yield chunks of f while a background thread keeps up to depth reads queued"""
+    chunks = queue.Queue(maxsize=depth)
+    stop = threading.Event()
 
-sha256 = hashlib.sha256()
-with open(filepath, "rb") as f:
-    for chunk in iter(lambda: f.read(chunk_size), b""):
-        sha256.update(chunk)
-print(sha256.hexdigest())
-"""
+    def put(item) -> bool:
+        # bounded waits, so the reader exits once the consumer has stopped
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def reader() -> None:
+        try:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                if not put(chunk):
+                    return
+            put(None)
+        except BaseException as e:
+            put(e)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    try:
+        while (chunk := chunks.get()) is not None:
+            if isinstance(chunk, BaseException):
+                raise chunk
+            yield chunk
+    finally:
+        stop.set()
+        thread.join()
 
 
 def calculate_sha256_worker(filepath: str, chunk_size: int = 4 * 1024 * 1024) -> str:
-    """Calculate SHA-256 in a separate process"""
-    result = subprocess.run(
-        [sys.executable, "-c", CALC_CMD, filepath, str(chunk_size)],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-    )
-    assert result.returncode == 0, result.stderr
-    return result.stdout.strip()
+    """Calculate SHA-256 in the current process, hashlib releases the GIL on update"""
+    with open(filepath, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            # only a hint, some network and FUSE mounts reject it
+            with contextlib.suppress(OSError):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        if os.fstat(f.fileno()).st_size >= READ_AHEAD_THRESHOLD:
+            # overlap disk reads with hashing for large model files
+            sha256 = hashlib.sha256()
+            for chunk in _read_ahead(f, chunk_size):
+                sha256.update(chunk)
+            return sha256.hexdigest()
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        sha256 = hashlib.sha256()
+        mv = memoryview(bytearray(chunk_size))
+        while n := f.readinto(mv):
+            sha256.update(mv[:n])
+    return sha256.hexdigest()
+
+
+_HASH_POOL: Optional[ThreadPoolExecutor] = None
+_HASH_POOL_LOCK = threading.Lock()
+# Serializes the read-merge-write of SHA_CACHE_FILE between threads
+_CACHE_LOCK = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    """The thread pool for hashing, shared by all calls to keep threads warm"""
+    global _HASH_POOL
+    with _HASH_POOL_LOCK:
+        if _HASH_POOL is None:
+            _HASH_POOL = ThreadPoolExecutor(
+                max_workers=max(1, (os.cpu_count() or 1)),
+                thread_name_prefix="sha256",
+            )
+    return _HASH_POOL
+
+
+def _load_cache() -> dict:
+    if SHA_CACHE_FILE.exists():
+        try:
+            with SHA_CACHE_FILE.open("r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError):
+            pass
+    return {}
 
 
 def get_sha256(filepath: str) -> str:
@@ -52,76 +134,79 @@ def batch_get_sha256(filepaths: List[str], cache_only: bool = False) -> Dict[str
 async def async_batch_get_sha256(
     filepaths: List[str],
     cache_only: bool = False,
+    stat_cache: Optional[Dict[str, os.stat_result]] = None,
 ) -> Dict[str, str]:
+    """Calculate SHA-256 of files, stat results given in stat_cache are reused"""
     # Load cache
-    cache = {}
-    if SHA_CACHE_FILE.exists():
-        try:
-            with SHA_CACHE_FILE.open("r") as f:
-                cache = json.load(f)
-        except (json.JSONDecodeError, IOError):
-            pass
-
-    # Initialize process pool
-    max_workers = max(1, (os.cpu_count() or 1))
+    cache = _load_cache()
 
     # Process files
     results = {}
     new_cache = {}
-    async with asyncio.Lock():
-        with ThreadPoolExecutor(max_workers=max_workers) as pool:
-            loop = asyncio.get_event_loop()
-
-            for filepath in filepaths:
-                if not os.path.exists(filepath):
-                    results[filepath] = None
-                    continue
-
-                # Get file info
+    pending = []
+    pool = _get_pool()
+    loop = asyncio.get_running_loop()
+
+    for filepath in filepaths:
+        # Get file info
+        stat = stat_cache.get(filepath) if stat_cache else None
+        if stat is None:
+            try:
                 stat = os.stat(filepath)
-                current_size = stat.st_size
-                current_time = stat.st_ctime
-
-                # Check cache
-                cache_entry = cache.get(filepath)
-                if cache_entry:
-                    if (
-                        cache_entry["size"] == current_size
-                        and cache_entry["birthtime"] == current_time
-                    ):
-                        results[filepath] = cache_entry["sha256"]
-                        continue
-
-                if cache_only:
-                    results[filepath] = ""
-                    continue
-
-                # Calculate new SHA
-                calc_func = partial(calculate_sha256_worker, filepath)
-                sha256 = await loop.run_in_executor(pool, calc_func)
-
-                # Update cache and results
-                new_cache[filepath] = {
-                    "sha256": sha256,
-                    "size": current_size,
-                    "birthtime": current_time,
-                    "last_verified": datetime.now().isoformat(),
-                }
-                results[filepath] = sha256
-
-    # Save cache
-    try:
-        with SHA_CACHE_FILE.open("r") as f:
-            cache = json.load(f)
-    except (IOError, OSError):
-        cache = {}
-
-    cache.update(new_cache)
-
-    try:
-        with SHA_CACHE_FILE.open("w") as f:
-            json.dump(cache, f, indent=2)
-    except (IOError, OSError):
-        pass
+            except FileNotFoundError:
+                results[filepath] = None
+                continue
+        current_size = stat.st_size
+        current_time = stat.st_ctime
+
+        # Check cache
+        cache_entry = cache.get(filepath)
+        if cache_entry:
+            if (
+                cache_entry["size"] == current_size
+                and cache_entry["birthtime"] == current_time
+            ):
+                results[filepath] = cache_entry["sha256"]
+                continue
+
+        if cache_only:
+            results[filepath] = ""
+            continue
+
+        # Schedule the SHA calculation, all files are hashed concurrently
+        results[filepath] = None
+        calc_func = partial(calculate_sha256_worker, filepath)
+        pending.append((filepath, stat, loop.run_in_executor(pool, calc_func)))
+
+    shas = await asyncio.gather(*(fut for _, _, fut in pending))
+
+    for (filepath, stat, _), sha256 in zip(pending, shas):
+        # Update cache and results
+        new_cache[filepath] = {
+            "sha256": sha256,
+            "size": stat.st_size,
+            "birthtime": stat.st_ctime,
+            "last_verified": datetime.now().isoformat(),
+        }
+        results[filepath] = sha256
+
+    if not new_cache:
+        return results
+
+    # Save cache atomically, a killed process must not leave a truncated file.
+    # Re-read it first so entries written by concurrent calls are kept.
+    tmp_file = SHA_CACHE_FILE.with_suffix(
+        f".{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    with _CACHE_LOCK:
+        cache = _load_cache()
+        cache.update(new_cache)
+        try:
+            with tmp_file.open("w") as f:
+                json.dump(cache, f, separators=(",", ":"))
+            os.replace(tmp_file, SHA_CACHE_FILE)
+        except (IOError, OSError):
+            with contextlib.suppress(OSError):
+                tmp_file.unlink()
 
     return results
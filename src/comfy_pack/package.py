@@ -1,19 +1,27 @@
 from __future__ import annotations
 
 import contextlib
+import hashlib
 import json
 import os
 import shutil
 import subprocess
 import sys
 import tempfile
-import threading
+import time
 import urllib.parse
 import urllib.request
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import TYPE_CHECKING
 
-from .const import COMFYUI_REPO, MODEL_DIR, STRICT_MODE
+from .const import (
+    COMFYUI_REPO,
+    GIT_CACHE_DIR,
+    MODEL_DIR,
+    STRICT_MODE,
+)
 from .hash import get_sha256
 from .utils import get_self_git_commit
 
@@ -21,9 +29,225 @@ if TYPE_CHECKING:
     import bentoml
 
 COMFY_PACK_DIR = Path(__file__).parent
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_BUFFER_SIZE = 8 * 1024 * 1024
+PROGRESS_INTERVAL = 0.25
+MAX_PARALLEL_DOWNLOADS = 8
 
 
 def _clone_commit(url: str, commit: str, dir: Path, verbose: int = 0):
+    if GIT_CACHE_DIR is not None:
+        try:
+            _clone_commit_cached(url, commit, dir, verbose=verbose)
+            return
+        except (OSError, subprocess.CalledProcessError) as e:
+            if verbose > 0:
+                print(f"Cloning {url} from the git cache failed: {e}")
+            shutil.rmtree(dir, ignore_errors=True)
+    try:
+        _clone_commit_shallow(url, commit, dir, verbose=verbose)
+        return
+    except (OSError, subprocess.CalledProcessError):
+        # Some servers refuse shallow fetches of arbitrary commits
+        if verbose > 0:
+            print(f"Shallow clone of {url} failed, falling back to a full clone")
+        shutil.rmtree(dir, ignore_errors=True)
+    try:
+        import pygit2  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        # a full clone, but in-process and without needing a git binary
+        try:
+            _clone_commit_pygit2(url, commit, dir, verbose=verbose)
+            return
+        except Exception as e:
+            if verbose > 0:
+                print(f"Cloning {url} with pygit2 failed: {e}, falling back to git")
+            shutil.rmtree(dir, ignore_errors=True)
+    _clone_commit_full(url, commit, dir, verbose=verbose)
+
+
+@contextlib.contextmanager
+def _git_cache_lock(cache: Path):
+    try:
+        import fcntl
+    except ImportError:  # Windows, no advisory locks
+        yield
+        return
+    with open(cache.with_suffix(".lock"), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _ensure_git_cache(url: str, commit: str, verbose: int = 0) -> Path:
+    """Create or update the bare mirror of url so that it contains commit.
+
+    Must be called with the cache lock held.
+    """
+    assert GIT_CACHE_DIR is not None
+    stdout = None if verbose > 0 else subprocess.DEVNULL
+    stderr = None if verbose > 1 else subprocess.DEVNULL
+    env = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+    cache = GIT_CACHE_DIR / f"{hashlib.sha1(url.encode()).hexdigest()}.git"
+    if not cache.exists():
+        partial = cache.with_suffix(".partial")
+        shutil.rmtree(partial, ignore_errors=True)
+        subprocess.check_call(
+            ["git", "clone", "--bare", "--quiet", url, partial],
+            stdout=stdout,
+            stderr=stderr,
+            env=env,
+        )
+        os.replace(partial, cache)
+    has_commit = (
+        subprocess.call(
+            ["git", "cat-file", "-e", f"{commit}^{{commit}}"],
+            cwd=cache,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        == 0
+    )
+    if not has_commit:
+        # Pin the commit under its own ref so gc never prunes it
+        subprocess.check_call(
+            ["git", "fetch", "-q", url, f"+{commit}:refs/cpack/{commit}"],
+            cwd=cache,
+            stdout=stdout,
+            stderr=stderr,
+            env=env,
+        )
+    return cache
+
+
+def _clone_commit_cached(url: str, commit: str, dir: Path, verbose: int = 0):
+    """Clone through a shared bare mirror under GIT_CACHE_DIR.
+
+    Repeated installs of the same repository only fetch new objects into
+    the mirror. The working clone is a local clone of the mirror, so git
+    hardlinks its objects instead of downloading them again.
+    """
+    assert GIT_CACHE_DIR is not None
+    stdout = None if verbose > 0 else subprocess.DEVNULL
+    stderr = None if verbose > 1 else subprocess.DEVNULL
+    env = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+    GIT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    lock_path = GIT_CACHE_DIR / hashlib.sha1(url.encode()).hexdigest()
+    with _git_cache_lock(lock_path):
+        cache = _ensure_git_cache(url, commit, verbose=verbose)
+        subprocess.check_call(
+            ["git", "clone", "--quiet", "--no-checkout", cache, dir],
+            stdout=stdout,
+            stderr=stderr,
+            env=env,
+        )
+    subprocess.check_call(
+        ["git", "remote", "set-url", "origin", url],
+        cwd=dir,
+        stdout=stdout,
+        stderr=stderr,
+        env=env,
+    )
+    subprocess.check_call(
+        ["git", "checkout", "-q", commit],
+        cwd=dir,
+        stdout=stdout,
+        stderr=stderr,
+        env=env,
+    )
+    subprocess.check_call(
+        ["git", "submodule", "update", "--init", "--recursive"],
+        cwd=dir,
+        stdout=stdout,
+        stderr=stderr,
+        env=env,
+    )
+
+
+def _clone_commit_pygit2(url: str, commit: str, dir: Path, verbose: int = 0):
+    """Clone in-process with libgit2, saving a git subprocess per step"""
+    import pygit2
+
+    callbacks = None
+    if verbose > 0:
+
+        class _Callbacks(pygit2.RemoteCallbacks):
+            def transfer_progress(self, stats):
+                print(
+                    f"\rReceiving objects: {stats.received_objects}"
+                    f"/{stats.total_objects}",
+                    end="",
+                )
+
+        callbacks = _Callbacks()
+
+    repo = pygit2.clone_repository(url, str(dir), callbacks=callbacks)
+    target = repo.get(commit)
+    if target is None:
+        repo.remotes["origin"].fetch([commit], callbacks=callbacks)
+        target = repo.get(commit)
+        if target is None:
+            raise RuntimeError(f"Commit {commit} not found in {url}")
+    repo.checkout_tree(target)
+    repo.set_head(target.id)
+    _update_submodules_pygit2(repo, callbacks)
+    if verbose > 0:
+        print()
+
+
+def _update_submodules_pygit2(repo, callbacks=None):
+    repo.submodules.update(init=True, callbacks=callbacks)
+    for submodule in repo.submodules:
+        _update_submodules_pygit2(submodule.open(), callbacks)
+
+
+def _clone_commit_shallow(url: str, commit: str, dir: Path, verbose: int = 0):
+    stdout = None if verbose > 0 else subprocess.DEVNULL
+    stderr = None if verbose > 1 else subprocess.DEVNULL
+    env = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+    subprocess.check_call(
+        [
+            "git",
+            "clone",
+            "--filter=blob:none",
+            "--no-checkout",
+            "--depth",
+            "1",
+            url,
+            dir,
+        ],
+        stdout=stdout,
+        stderr=stderr,
+        env=env,
+    )
+    subprocess.check_call(
+        ["git", "fetch", "-q", "--depth", "1", "origin", commit],
+        cwd=dir,
+        stdout=stdout,
+        stderr=stderr,
+        env=env,
+    )
+    subprocess.check_call(
+        ["git", "checkout", "FETCH_HEAD"],
+        cwd=dir,
+        stdout=stdout,
+        stderr=stderr,
+        env=env,
+    )
+    subprocess.check_call(
+        ["git", "submodule", "update", "--init", "--recursive", "--depth", "1"],
+        cwd=dir,
+        stdout=stdout,
+        stderr=stderr,
+        env=env,
+    )
+
+
+def _clone_commit_full(url: str, commit: str, dir: Path, verbose: int = 0):
     stdout = None if verbose > 0 else subprocess.DEVNULL
     stderr = None if verbose > 1 else subprocess.DEVNULL
     env = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
@@ -135,6 +359,50 @@ def install_custom_modules(snapshot, workspace: Path, verbose: int = 0):
             f.write(commit_hash)
 
 
+def _snapshot_pip_requirements(snapshot: dict) -> list[str]:
+    """Requirements for the snapshot pips that ``cm-cli.py restore-snapshot
+    --pip-non-url --pip-non-local-url`` would install, so that they can be
+    resolved in the same uv call as the requirements files"""
+    requirements = []
+    for name, url in snapshot.get("pips", {}).items():
+        # ComfyUI-Manager leaves the torch stack alone when restoring
+        if name.startswith(("torch==", "torchvision==", "torchaudio==", "nvidia-")):
+            continue
+        if name.startswith("-"):  # editable installs
+            continue
+        if not url:
+            requirements.append(name)
+        elif not url.startswith("file:"):
+            requirements.append(f"{name} @ {url}")
+    return requirements
+
+
+def _requirements_checksum(
+    python_version: str,
+    req_files: list[str],
+    no_deps: bool = False,
+    packages: list[str] | None = None,
+) -> str:
+    """Checksum of what a venv is installed from, stored in its DONE marker"""
+    sha = hashlib.sha256(f"{python_version}\n{no_deps}\n".encode())
+    for req_file in sorted(str(f) for f in req_files):
+        sha.update(Path(req_file).read_bytes())
+    for package in sorted(packages or []):
+        sha.update(f"{package}\n".encode())
+    return sha.hexdigest()
+
+
+def _remove_custom_nodes(workspace: Path) -> None:
+    """Remove the cloned custom nodes so that they are installed again"""
+    custom_nodes = workspace / "custom_nodes"
+    if not custom_nodes.is_dir():
+        return
+    for node in custom_nodes.iterdir():
+        if node.name == "ComfyUI-Manager" or not node.joinpath(".git").exists():
+            continue
+        shutil.rmtree(node)
+
+
 def install_dependencies(
     python_version: str,
     req_files: list[str],
@@ -142,8 +410,17 @@ def install_dependencies(
     verbose: int = 0,
     no_deps: bool = False,
     no_venv: bool = False,
-) -> Path:
+    packages: list[str] | None = None,
+) -> tuple[Path, bool]:
+    """Install req_files and packages, returning the python executable and
+    whether packages were installed.
+
+    Unless STRICT_MODE is set, a failure to resolve packages together with
+    req_files is not fatal: req_files are installed alone and packages are
+    left to the caller.
+    """
     print("Installing Python dependencies")
+    lenient = bool(packages) and not STRICT_MODE
     stdout = None if verbose > 0 else subprocess.DEVNULL
     stderr = None if verbose > 1 else subprocess.DEVNULL
     if no_venv:
@@ -156,31 +433,44 @@ def install_dependencies(
             if os.name == "nt"
             else venv / "bin" / "python"
         )
-        if (venv / "DONE").exists():
-            return venv_py
-        subprocess.check_call(
-            [
-                "uv",
-                "venv",
-                "--python",
-                python_version,
-                venv,
-            ],
-            stdout=stdout,
-            stderr=stderr,
+        checksum = _requirements_checksum(
+            python_version, req_files, no_deps, packages
         )
-    subprocess.check_call(
-        [
-            "uv",
-            "pip",
-            "install",
-            "-p",
-            str(venv_py),
-            "pip",
-        ],
-        stdout=stdout,
-        stderr=stderr,
-    )
+        # what the venv is built from, packages are installed on top of it
+        base_checksum = _requirements_checksum(python_version, req_files, no_deps)
+        create_venv = True
+        if (venv / "DONE").exists():
+            done = (venv / "DONE").read_text().split()
+            if done == ["DONE"]:
+                # written before checksums were recorded, keep the venv and
+                # let the install below bring it up to date
+                create_venv = False
+            elif done[:1] == [checksum]:
+                return venv_py, True
+            elif lenient and done[:1] == [base_checksum]:
+                # a previous install that had to leave packages out
+                return venv_py, False
+            elif done[1:] == [base_checksum]:
+                print("Snapshot pips changed, updating the virtual environment")
+                create_venv = False
+            else:
+                print("Python dependencies changed, recreating the virtual environment")
+                shutil.rmtree(venv)
+                # restore-snapshot skips nodes already at their commit, which
+                # would leave their requirements out of the new venv
+                _remove_custom_nodes(workspace)
+        if create_venv:
+            subprocess.check_call(
+                [
+                    "uv",
+                    "venv",
+                    "--python",
+                    python_version,
+                    venv,
+                ],
+                stdout=stdout,
+                stderr=stderr,
+            )
     if verbose > 0:
         print(f"Installing dependencies from {req_files}")
     install_cmd = [
@@ -190,21 +480,37 @@ def install_dependencies(
         "-p",
         str(venv_py),
     ]
+    # cm-cli.py and custom node install hooks run `python -m pip`
+    install_cmd.append("pip")
     for req_file in req_files:
         install_cmd.extend(["-r", str(req_file)])
     if not STRICT_MODE:
         install_cmd.extend(["--index-strategy", "unsafe-best-match"])
     if no_deps:
         install_cmd.append("--no-deps")
-    subprocess.check_call(
-        install_cmd,
-        stdout=stdout,
-        stderr=stderr,
-    )
+    packages_installed = True
+    try:
+        subprocess.check_call(
+            install_cmd + (packages or []),
+            stdout=stdout,
+            stderr=stderr,
+        )
+    except subprocess.CalledProcessError:
+        if not lenient:
+            raise
+        # e.g. a platform specific pin frozen on another OS
+        print("Failed to install the snapshot pips together with the requirements")
+        subprocess.check_call(
+            install_cmd,
+            stdout=stdout,
+            stderr=stderr,
+        )
+        packages_installed = False
     if not no_venv:
         with open(venv / "DONE", "w") as f:
-            f.write("DONE")
-    return venv_py
+            f.write(checksum if packages_installed else base_checksum)
+            f.write(f"\n{base_checksum}")
+    return venv_py, packages_installed
 
 
 def get_search_url(sha: str) -> str:
@@ -216,8 +522,37 @@ def get_search_url(sha: str) -> str:
     return f"{base_url}?q={hf_query}"
 
 
-def download_file(url: str, dest_path: Path, progress_callback=None):
-    """Download file with progress tracking"""
+class _ProgressReader:
+    """Wrap a response to count bytes read and report progress, at most once
+    per percent or PROGRESS_INTERVAL seconds"""
+
+    def __init__(self, response, total_size: int, progress_callback=None):
+        self.response = response
+        self.total_size = total_size
+        self.progress_callback = progress_callback
+        self.downloaded = 0
+        self.last_pct = -1
+        self.last_report = 0.0
+
+    def read(self, size: int = -1) -> bytes:
+        buffer = self.response.read(size)
+        self.downloaded += len(buffer)
+        if self.progress_callback and buffer:
+            progress = (
+                (self.downloaded / self.total_size) * 100 if self.total_size > 0 else 0
+            )
+            pct, now = int(progress), time.monotonic()
+            if pct != self.last_pct or now - self.last_report >= PROGRESS_INTERVAL:
+                self.last_pct = pct
+                self.last_report = now
+                self.progress_callback(progress)
+        return buffer
+
+
+def download_file(
+    url: str, dest_path: Path, progress_callback=None, quiet: bool = False
+):
+    """Download file with progress tracking, quiet disables curl's progress meter"""
 
     # prepare auth token from huggingface if possible
     if (token := os.getenv("HF_TOKEN")) and ("huggingface" in url):
@@ -230,27 +565,25 @@ def download_file(url: str, dest_path: Path, progress_callback=None):
 
     try:
         if shutil.which("curl"):
+            progress = ["--silent", "--show-error"] if quiet else []
             subprocess.check_call(
-                ["curl", "-L", url, *curl_auth, "--fail", "-o", str(dest_path)],
+                [
+                    "curl",
+                    "-L",
+                    url,
+                    *curl_auth,
+                    *progress,
+                    "--fail",
+                    "-o",
+                    str(dest_path),
+                ],
             )
             return True
         with urllib.request.urlopen(urllib_request) as response:
             total_size = int(response.headers.get("content-length", 0))
-            block_size = 8192
-            downloaded = 0
-
-            with open(dest_path, "wb") as f:
-                while True:
-                    buffer = response.read(block_size)
-                    if not buffer:
-                        break
-                    downloaded += len(buffer)
-                    f.write(buffer)
-                    if progress_callback:
-                        progress = (
-                            (downloaded / total_size) * 100 if total_size > 0 else 0
-                        )
-                        progress_callback(progress)
+            reader = _ProgressReader(response, total_size, progress_callback)
+            with open(dest_path, "wb", buffering=DOWNLOAD_BUFFER_SIZE) as f:
+                shutil.copyfileobj(reader, f, length=DOWNLOAD_CHUNK_SIZE)
         return True
     except Exception as e:
         print(f"Download failed: {e}")
@@ -268,6 +601,41 @@ def show_progress(filename: str):
     return callback
 
 
+def _fast_copy(src, dst):
+    """Copy with copy_file_range where available, which lets the kernel copy
+    in place or reflink on filesystems such as Btrfs and XFS"""
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        # src shrank or the filesystem gave up, never return
+                        # a truncated copy, let copy2 below retry it
+                        raise OSError(f"copy_file_range stopped short copying {src}")
+                    remaining -= copied
+            shutil.copystat(src, dst)
+            return dst
+        except OSError:
+            pass
+    # shutil.copy2 uses sendfile on Linux and fcopyfile on macOS
+    shutil.copy2(src, dst)
+    return dst
+
+
+def _link_or_copy(src, dst):
+    """Hard link src to dst, falling back to a copy across filesystems"""
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        if not os.path.samefile(src, dst):
+            _fast_copy(src, dst)
+    except OSError:
+        _fast_copy(src, dst)
+    return dst
+
+
 def create_model_symlink(global_path: Path, sha: str, target_path: Path, filename: str):
     """Create symlink from global storage to workspace"""
     source = global_path / sha
@@ -283,6 +651,47 @@ def create_model_symlink(global_path: Path, sha: str, target_path: Path, filenam
     os.symlink(source, target)
 
 
+def _print_line(message: str) -> None:
+    """Print from a worker thread, as one write so lines do not interleave"""
+    sys.stdout.write(f"{message}\n")
+    sys.stdout.flush()
+
+
+def _download_model(url: str, sha: str, filename: str, quiet: bool = False) -> bool:
+    """Download a model into the global storage, returns whether it succeeded.
+
+    With quiet, used for parallel downloads, only start and completion are
+    reported since progress lines of several downloads would interleave.
+    """
+    target_path = MODEL_DIR / sha
+    if quiet:
+        _print_line(f"Downloading {filename}...")
+        download_file(url, target_path, quiet=True)
+    else:
+        download_file(url, target_path, show_progress(filename))
+    # end the progress line
+    end_progress = "" if quiet else "\n"
+    if not target_path.exists():
+        _print_line(f"{end_progress}Download of {filename} failed!")
+        return False
+    _print_line(f"{end_progress}Download of {filename} completed!")
+    return True
+
+
+def _verify_model(sha: str, filename: str) -> bool:
+    """Verify a downloaded model, removing it on SHA256 mismatch"""
+    target_path = MODEL_DIR / sha
+    _print_line(f"Verifying SHA256 of {filename}...")
+    if get_sha256(str(target_path)) != sha:
+        _print_line(
+            f"SHA256 verification of {filename} failed! "
+            "File may be corrupted or incorrect."
+        )
+        target_path.unlink()
+        return False
+    return True
+
+
 def retrieve_models(
     snapshot: dict,
     workspace: Path,
@@ -298,6 +707,8 @@ def retrieve_models(
 
     MODEL_DIR.mkdir(parents=True, exist_ok=True)
 
+    to_download: dict[str, list[dict]] = {}
+    to_ask: list[dict] = []
     for model in models:
         sha = model["sha256"]
         filename = model["filename"]
@@ -320,27 +731,53 @@ def retrieve_models(
             continue
 
         print(f"\nModel {filename} is never downloaded before")
-        if source := model.get("source"):
-            url = source["download_url"]
-            target_path = MODEL_DIR / sha
-            download_thread = threading.Thread(
-                target=download_file,
-                args=(url, target_path, show_progress(filename)),
-            )
-            download_thread.start()
-            download_thread.join()
-
-            if not target_path.exists():
-                print("\nDownload failed!")
-                continue
-
-            print("\nDownload completed! Verifying SHA256...")
-            terget_sha = get_sha256(str(target_path))
-            if terget_sha != sha:
-                print("SHA256 verification failed! File may be corrupted or incorrect.")
-                target_path.unlink()
-            else:
-                continue
+        if model.get("source"):
+            to_download.setdefault(sha, []).append(model)
+        else:
+            to_ask.append(model)
+
+    if to_download:
+        # Download distinct models concurrently, each sha is fetched only once.
+        # Verification runs in its own pool so hashing a finished download
+        # does not hold up a download slot.
+        download_pool = ThreadPoolExecutor(
+            max_workers=min(MAX_PARALLEL_DOWNLOADS, len(to_download))
+        )
+        verify_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+        with download_pool, verify_pool:
+            downloads = {
+                download_pool.submit(
+                    _download_model,
+                    same[0]["source"]["download_url"],
+                    sha,
+                    same[0]["filename"],
+                    quiet=len(to_download) > 1,
+                ): sha
+                for sha, same in to_download.items()
+            }
+            verifications = {}
+            for future in as_completed(downloads):
+                sha = downloads[future]
+                if future.result():
+                    verifications[sha] = verify_pool.submit(
+                        _verify_model, sha, to_download[sha][0]["filename"]
+                    )
+            for sha, future in verifications.items():
+                verified = future.result()
+                for model in to_download[sha]:
+                    filename = model["filename"]
+                    if verified:
+                        create_model_symlink(MODEL_DIR, sha, workspace, filename)
+                    else:
+                        to_ask.append(model)
+
+    # Ask the user for the remaining models, one at a time
+    for model in to_ask:
+        sha = model["sha256"]
+        filename = model["filename"]
+        if (MODEL_DIR / sha).exists():
+            create_model_symlink(MODEL_DIR, sha, workspace, filename)
+            continue
 
         search_url = get_search_url(sha)
         print(f"Search URL: {search_url}")
@@ -357,13 +794,7 @@ def retrieve_models(
                     url = path
                     target_path = MODEL_DIR / sha
 
-                    # Start download in a separate thread
-                    download_thread = threading.Thread(
-                        target=download_file,
-                        args=(url, target_path, show_progress(filename)),
-                    )
-                    download_thread.start()
-                    download_thread.join()
+                    download_file(url, target_path, show_progress(filename))
 
                     if not target_path.exists():
                         print("\nDownload failed!")
@@ -396,8 +827,9 @@ def retrieve_models(
                         continue
 
                     print("SHA256 verification successful!")
-                    # Copy to global storage
-                    shutil.copy2(downloaded_path, MODEL_DIR / sha)
+                    # Copy to global storage, never link: MODEL_DIR entries are
+                    # trusted by sha and the user may rewrite their file later
+                    _fast_copy(downloaded_path, MODEL_DIR / sha)
 
                 # Create symlink
                 create_model_symlink(MODEL_DIR, sha, workspace, filename)
@@ -408,6 +840,41 @@ def retrieve_models(
                 continue
 
 
+def _is_sha256(name: str) -> bool:
+    return len(name) == 64 and all(c in "0123456789abcdef" for c in name)
+
+
+def _extract_cpack(cpack: Path, pack_dir: Path) -> None:
+    """Extract a cpack in one pass, bundled ``models/<sha>`` entries are written
+    straight into the global model storage instead of the pack directory.
+
+    Other workspaces trust MODEL_DIR entries by name, so a bundled model is
+    hashed while it is extracted and dropped if it does not match its sha.
+    """
+    with zipfile.ZipFile(cpack) as zf:
+        for info in zf.infolist():
+            parts = info.filename.split("/")
+            if len(parts) != 2 or parts[0] != "models" or not _is_sha256(parts[1]):
+                zf.extract(info, pack_dir)
+                continue
+            sha = parts[1]
+            target = MODEL_DIR / sha
+            if target.exists() and target.stat().st_size == info.file_size:
+                continue
+            MODEL_DIR.mkdir(parents=True, exist_ok=True)
+            temp_target = target.with_name(f".{target.name}.tmp")
+            sha256 = hashlib.sha256()
+            with zf.open(info) as src, open(temp_target, "wb") as dst:
+                while chunk := src.read(DOWNLOAD_CHUNK_SIZE):
+                    sha256.update(chunk)
+                    dst.write(chunk)
+            if sha256.hexdigest() != sha:
+                print(f"Bundled model {sha} is corrupted, skipping it")
+                temp_target.unlink()
+                continue
+            os.replace(temp_target, target)
+
+
 def install(
     cpack: str | Path,
     workspace: str | Path = "workspace",
@@ -424,7 +891,7 @@ def install(
         if cpack.is_file():
             temp_dir = stack.enter_context(tempfile.TemporaryDirectory())
             pack_dir = Path(temp_dir) / ".cpack"
-            shutil.unpack_archive(cpack, pack_dir)
+            _extract_cpack(cpack, pack_dir)
         else:
             pack_dir = cpack
         snapshot = json.loads((pack_dir / "snapshot.json").read_text())
@@ -435,7 +902,7 @@ def install(
             )
 
         install_comfyui(snapshot, workspace, verbose=verbose)
-        py = install_dependencies(
+        py, pips_installed = install_dependencies(
             snapshot["python"],
             [
                 str(workspace / "requirements.txt"),
@@ -446,25 +913,30 @@ def install(
             workspace,
             no_venv=no_venv,
             verbose=verbose,
+            packages=_snapshot_pip_requirements(snapshot),
         )
         cm_cli = Path("custom_nodes", "ComfyUI-Manager", "cm-cli.py")
+        restore_cmd = [str(py), str(cm_cli), "restore-snapshot"]
+        if not pips_installed:
+            # let ComfyUI-Manager install the pips one by one, skipping failures
+            restore_cmd.extend(["--pip-non-url", "--pip-non-local-url"])
         subprocess.check_call(
-            [
-                str(py),
-                str(cm_cli),
-                "restore-snapshot",
-                "--pip-non-url",
-                "--pip-non-local-url",
-                str(pack_dir / "snapshot.json"),
-            ],
+            [*restore_cmd, str(pack_dir / "snapshot.json")],
             cwd=workspace,
         )
 
+        # Only link files we extracted ourselves, not a user's pack directory
+        copy_input = _link_or_copy if cpack.is_file() else _fast_copy
         for f in (pack_dir / "input").glob("*"):
             if f.is_file():
-                shutil.copy(f, workspace / "input" / f.name)
+                copy_input(f, workspace / "input" / f.name)
             elif f.is_dir():
-                shutil.copytree(f, workspace / "input" / f.name, dirs_exist_ok=True)
+                shutil.copytree(
+                    f,
+                    workspace / "input" / f.name,
+                    copy_function=copy_input,
+                    dirs_exist_ok=True,
+                )
         if prepare_models:
             retrieve_models(
                 snapshot,
@@ -520,8 +992,13 @@ def build_bento(
     shutil.copy2(Path(__file__).with_name("service.py"), source_dir / "service.py")
     snapshot_text = (source_dir / "snapshot.json").read_text()
     setup_script = source_dir / "setup_workspace.sh"
-    with Path(__file__).with_name("setup_workspace.sh").open() as f:
-        setup_script.write_text(f.read().replace("<SNAPSHOT>", snapshot_text))
+    template = Path(__file__).with_name("setup_workspace.sh").read_text()
+    # splice the snapshot in without building another copy of the whole script
+    head, _, tail = template.partition("<SNAPSHOT>")
+    with setup_script.open("w") as f:
+        f.write(head)
+        f.write(snapshot_text)
+        f.write(tail)
     # Make setup script executable in a cross-platform way
     if os.name in ("posix", "mac"):
         setup_script.chmod(setup_script.stat().st_mode | 0o755)
@@ -39,8 +39,12 @@ def _get_workspace() -> Path:
 
     from bentoml._internal.configuration.containers import BentoMLContainer
 
-    snapshot = BASE_DIR / "snapshot.json"
-    checksum = hashlib.md5(snapshot.read_bytes().strip()).hexdigest()
+    # must match the `md5sum` of snapshot.json computed by setup_workspace.sh
+    md5 = hashlib.md5(usedforsecurity=False)
+    with BASE_DIR.joinpath("snapshot.json").open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            md5.update(chunk)
+    checksum = md5.hexdigest()
     wp = (
         Path(BentoMLContainer.bentoml_home.get()) / "run" / "comfy_workspace" / checksum
     )
@@ -54,15 +58,13 @@ def workflow_json():
 
 
 def _watch_server(server: comfy_pack.run.ComfyUIServer):
-    while True:
-        time.sleep(1)
-        if not server.is_running():
-            if server.server_proc is not None:
-                logger.warning(
-                    "Server exited with code %s", server.server_proc.returncode
-                )
-                os.kill(os.getpid(), signal.SIGTERM)
-            break
+    while (proc := server.server_proc) is None:
+        time.sleep(0.1)
+    returncode = proc.wait()
+    # server_proc is reset when the server is stopped on purpose
+    if server.server_proc is not None:
+        logger.warning("Server exited with code %s", returncode)
+        os.kill(os.getpid(), signal.SIGTERM)
 
 
 if not EXISTING_COMFYUI_SERVER:
@@ -138,6 +140,11 @@ class ComfyService:
         comfy_workspace = _get_workspace()
         if not comfy_workspace.joinpath(".DONE").exists():
             raise RuntimeError("ComfyUI workspace is not ready")
+        hf_models = {
+            (m.model_id.lower(), m.revision.lower()): m
+            for m in ComfyService.models
+            if isinstance(m, HuggingFaceModel)
+        }
         for model in snapshot["models"]:
             if model.get("disabled", False):
                 continue
@@ -151,15 +158,8 @@ class ComfyService:
                 print(f"Copying {model_file} to {model_path}")
                 model_path.symlink_to(model_file)
             elif (source := model["source"]).get("source") == "huggingface":
-                matched = next(
-                    (
-                        m
-                        for m in ComfyService.models
-                        if isinstance(m, HuggingFaceModel)
-                        and m.model_id.lower() == source["repo"].lower()
-                        and source["commit"].lower() == m.revision.lower()
-                    ),
-                    None,
+                matched = hf_models.get(
+                    (source["repo"].lower(), source["commit"].lower())
                 )
                 if matched is not None:
                     model_file = os.path.join(matched.resolve(), source["path"])